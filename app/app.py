@@ -1,38 +1,126 @@
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
+import orjson
 import tensorflow as tf
 import numpy as np
 import joblib
-import json
-from PIL import Image
 import os
-from sklearn.neighbors import NearestNeighbors
+import sys
+import queue
+import threading
+import time
+from functools import lru_cache
 import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+
+class ORJSONProvider(JSONProvider):
+    """JSON provider backed by orjson, serializes NumPy values natively"""
+    option = orjson.OPT_SERIALIZE_NUMPY
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj, option=self.option).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(
+            orjson.dumps(obj, option=self.option),
+            mimetype='application/json'
+        )
 
 app = Flask(__name__)
+app.json = ORJSONProvider(app)
 
 # Initialize models as None
 cnn_model = None
-knn_model = None
 dataset = None
+food_names = None
+kalori = None
+karbohidrat = None
+protein = None
+lemak = None
+name_to_idx = None
+features_np = None
+interpreters = []
+input_index = None
+output_index = None
+_infer = None
+
+# Inference backend: 'tflite' (INT8 interpreter) or 'xla' (XLA-compiled Keras)
+INFERENCE_BACKEND = os.environ.get('INFERENCE_BACKEND', 'tflite')
+TFLITE_MODEL_PATH = 'model.tflite'
+# Batch workers per process, each with its own interpreters. One worker
+# already batches all concurrent requests of a threaded server and gets the
+# whole CPU share; raise it only when batches queue up behind each other
+INFERENCE_WORKERS = int(os.environ.get('INFERENCE_WORKERS', 1))
+# Number of server processes sharing the CPUs, gunicorn reads the same
+# variable as its default worker count
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', 1))
+# XNNPACK (enabled by default in the builtin op resolver) uses this many
+# threads per interpreter, split across all processes and batch workers
+TFLITE_THREADS = int(os.environ.get(
+    'TFLITE_THREADS',
+    max(1, (os.cpu_count() or 1) // (WEB_CONCURRENCY * INFERENCE_WORKERS))
+))
+CALIBRATION_DIR = 'calibration'
+
+# Dataset is served from an uncompressed Feather file so it can be mmapped
+DATASET_JSON_PATH = 'dataset.json'
+DATASET_PATH = 'dataset.feather'
+FEATURE_COLUMNS = ['Karbohidrat (g)', 'Protein (g)', 'Lemak (g)']
+N_NEIGHBORS = 5
+
+# Dynamic batching of concurrent /predict requests, batches are padded up to
+# one of a few fixed sizes so XLA and TFLite only ever see these shapes
+BATCH_SIZES = (1, 2, 4, 8, 16)
+MAX_BATCH = BATCH_SIZES[-1]
+BATCH_TIMEOUT = 0.008
+request_queue = queue.Queue()
+batch_threads = []
+# Requests inside predict_food, so the batch worker only waits for more
+# images while some are still being preprocessed
+pending_requests = 0
+pending_lock = threading.Lock()
+
+# Calculator lookup tables
+ACTIVITY_MULTIPLIERS = {
+    "ringan": 1.375,
+    "sedang": 1.55,
+    "berat": 1.725
+}
+MALE_GENDERS = {"pria"}
 
 # Define calculator functions
 def hitung_bmr_tdee(berat_badan, tinggi_badan, umur, jenis_kelamin, tingkat_aktivitas):
     """Calculate BMR and TDEE"""
-    if jenis_kelamin.lower() == 'pria':
+    pengali = ACTIVITY_MULTIPLIERS.get(tingkat_aktivitas.lower())
+    if pengali is None:
+        raise ValueError("Tingkat aktivitas tidak valid. Pilih 'ringan', 'sedang', atau 'berat'.")
+
+    if jenis_kelamin.lower() in MALE_GENDERS:
         bmr = 10 * berat_badan + 6.25 * tinggi_badan - 5 * umur + 5
     else:  # wanita
         bmr = 10 * berat_badan + 6.25 * tinggi_badan - 5 * umur - 161
 
-    activity_multipliers = {
-        "ringan": 1.375,
-        "sedang": 1.55,
-        "berat": 1.725
-    }
-    
-    if tingkat_aktivitas.lower() not in activity_multipliers:
+    tdee = bmr * pengali
+    return bmr, tdee
+
+def hitung_bmr_tdee_batch(berat_badan, tinggi_badan, umur, jenis_kelamin, tingkat_aktivitas):
+    """Calculate BMR and TDEE for lists of inputs in one vectorized pass"""
+    try:
+        pengali = np.array([ACTIVITY_MULTIPLIERS[t.lower()] for t in tingkat_aktivitas])
+    except KeyError:
         raise ValueError("Tingkat aktivitas tidak valid. Pilih 'ringan', 'sedang', atau 'berat'.")
-        
-    tdee = bmr * activity_multipliers[tingkat_aktivitas.lower()]
+    pria = np.array([g.lower() in MALE_GENDERS for g in jenis_kelamin])
+
+    bmr = (10 * np.asarray(berat_badan, dtype=np.float64)
+           + 6.25 * np.asarray(tinggi_badan, dtype=np.float64)
+           - 5 * np.asarray(umur, dtype=np.float64)
+           + np.where(pria, 5, -161))
+    tdee = bmr * pengali
     return bmr, tdee
 
 def hitung_kebutuhan_makronutrien(tdee):
@@ -47,94 +135,360 @@ def hitung_kebutuhan_makronutrien(tdee):
 
     return gram_karbohidrat, gram_protein, gram_lemak
 
-def create_knn_model(df):
-    """Create and train KNN model"""
-    features = df[['Karbohidrat (g)', 'Protein (g)', 'Lemak (g)']].values
-    knn = NearestNeighbors(n_neighbors=5, metric='euclidean')
-    knn.fit(features)
-    return knn
+def create_knn_model(table):
+    """Create feature matrix for brute-force KNN search"""
+    # Zero-copy (N, 3) view over the float32 feature column in the file
+    features = table.column("features").chunk(0).flatten()
+    return features.to_numpy().reshape(-1, len(FEATURE_COLUMNS))
+
+def as_number(value):
+    """Return whole values as int, the way dataset.json writes them"""
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+def get_nutrition(i):
+    """Get nutrition info of the i-th food in the dataset"""
+    return {
+        "kalori": as_number(kalori[i]),
+        "karbohidrat": as_number(karbohidrat[i]),
+        "protein": as_number(protein[i]),
+        "lemak": as_number(lemak[i])
+    }
+
+def make_infer(model):
+    """Build the XLA-compiled forward pass around a loaded Keras model"""
+    @tf.function(
+        input_signature=[tf.TensorSpec((None, 224, 224, 3), tf.float32)],
+        jit_compile=True
+    )
+    def infer(x):
+        """Return predicted class and confidence for each image"""
+        prediction = model(x, training=False)
+        return (
+            tf.argmax(prediction, axis=1, output_type=tf.int32),
+            tf.reduce_max(prediction, axis=1)
+        )
+    return infer
+
+@tf.function(input_signature=[tf.TensorSpec((), tf.string)])
+def preprocess_image(raw):
+    """Decode an encoded image into a normalized (1, 224, 224, 3) batch"""
+    img = tf.io.decode_image(raw, channels=3, expand_animations=False)
+    # Resize the uint8 image first so the full-resolution upload is never
+    # expanded to float32. Bicubic with antialiasing matches the PIL resize
+    # the model was served with
+    img = tf.image.resize(img, [224, 224], method='bicubic', antialias=True)
+    # Scale the small float32 result to [0, 1] in one multiply, clipping
+    # the bicubic overshoot like PIL's uint8 output
+    img = tf.clip_by_value(img * (1.0 / 255.0), 0.0, 1.0)
+    return img[None, ...]
+
+def create_interpreter(batch_size):
+    """Create a TFLite interpreter with a fixed batch size"""
+    interpreter = tf.lite.Interpreter(
+        model_path=TFLITE_MODEL_PATH,
+        num_threads=TFLITE_THREADS
+    )
+    interpreter.resize_tensor_input(
+        interpreter.get_input_details()[0]['index'], (batch_size, 224, 224, 3)
+    )
+    interpreter.allocate_tensors()
+    return interpreter
+
+def create_interpreters():
+    """Create one interpreter per batch size, or placeholders for XLA"""
+    if INFERENCE_BACKEND == 'xla':
+        return {batch_size: None for batch_size in BATCH_SIZES}
+    return {batch_size: create_interpreter(batch_size) for batch_size in BATCH_SIZES}
+
+def bucket_size(n):
+    """Smallest fixed batch size that fits n images"""
+    return next(batch_size for batch_size in BATCH_SIZES if batch_size >= n)
+
+def run_inference(img_array, interpreter=None):
+    """Run the CNN on a preprocessed image batch, return classes and confidences"""
+    if INFERENCE_BACKEND == 'xla':
+        classes, confidences = _infer(tf.constant(img_array, dtype=tf.float32))
+        return classes.numpy(), confidences.numpy()
+
+    interpreter.set_tensor(input_index, img_array)
+    interpreter.invoke()
+    prediction = interpreter.get_tensor(output_index)
+    return np.argmax(prediction, axis=1), np.max(prediction, axis=1)
+
+def batch_worker(slot):
+    """Collect queued images into batches and run them through the CNN"""
+    # Input buffer and interpreters[slot] are used by this worker thread only
+    batch_buf = np.empty((MAX_BATCH, 224, 224, 3), dtype=np.float32)
+    while True:
+        items = [request_queue.get()]
+        deadline = time.monotonic() + BATCH_TIMEOUT
+        while len(items) < MAX_BATCH:
+            try:
+                items.append(request_queue.get_nowait())
+                continue
+            except queue.Empty:
+                pass
+
+            # Nothing else queued, wait only if other requests are on the way
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or pending_requests <= len(items):
+                break
+            try:
+                items.append(request_queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        try:
+            for i, (img_array, _, _) in enumerate(items):
+                np.copyto(batch_buf[i], img_array[0])
+
+            # Pad to a fixed size, the padding rows' outputs are dropped by zip
+            # Look the interpreter up on every batch so a reload takes effect
+            batch_size = bucket_size(len(items))
+            classes, confidences = run_inference(
+                batch_buf[:batch_size], interpreters[slot][batch_size]
+            )
+            for cls, conf, (_, _, result) in zip(classes, confidences, items):
+                result['class'] = cls
+                result['confidence'] = conf
+        except Exception as e:
+            for _, _, result in items:
+                result['error'] = e
+        finally:
+            for _, event, _ in items:
+                event.set()
+
+def calibration_files():
+    """List up to 100 sample images used for INT8 calibration"""
+    if not os.path.isdir(CALIBRATION_DIR):
+        return []
+    return sorted(os.listdir(CALIBRATION_DIR))[:100]
+
+def representative_dataset():
+    """Yield preprocessed sample images for INT8 calibration"""
+    for name in calibration_files():
+        raw = tf.io.read_file(os.path.join(CALIBRATION_DIR, name))
+        yield [preprocess_image(raw).numpy()]
+
+def convert_to_tflite(model):
+    """Convert Keras model to quantized TFLite and cache it to disk"""
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    converter.optimizations = [tf.lite.Optimize.DEFAULT]
+    if calibration_files():
+        # Full INT8 quantization calibrated on real sample images
+        converter.representative_dataset = representative_dataset
+    else:
+        # Without samples, only quantize weights (dynamic range) rather
+        # than calibrating activation ranges on meaningless inputs
+        print(f"WARNING: no calibration images in '{CALIBRATION_DIR}/', "
+              "falling back to dynamic-range quantization")
+    tflite_model = converter.convert()
+
+    # Write atomically so concurrent workers never read a partial file
+    tmp_path = f'{TFLITE_MODEL_PATH}.{os.getpid()}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(tflite_model)
+    os.replace(tmp_path, TFLITE_MODEL_PATH)
+
+def convert_dataset():
+    """Convert dataset.json to an uncompressed Feather file"""
+    df = pd.read_json(DATASET_JSON_PATH)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+
+    # Store the KNN features as one contiguous float32 column so the
+    # feature matrix can be used straight from the mapped file
+    features = df[FEATURE_COLUMNS].to_numpy(dtype=np.float32).ravel()
+    table = table.append_column("features", pa.FixedSizeListArray.from_arrays(
+        pa.array(features), len(FEATURE_COLUMNS)
+    ))
+
+    # Write atomically so concurrent workers never read a partial file, as a
+    # single record batch so every column is one contiguous chunk
+    tmp_path = f'{DATASET_PATH}.{os.getpid()}.tmp'
+    feather.write_feather(
+        table, tmp_path, compression='uncompressed',
+        chunksize=max(1, table.num_rows)
+    )
+    os.replace(tmp_path, DATASET_PATH)
+
+def prepare_caches():
+    """Build model.tflite and dataset.feather ahead of serving"""
+    model = tf.keras.models.load_model('v1.h5', compile=False)
+    if INFERENCE_BACKEND != 'xla':
+        convert_to_tflite(model)
+        print("TFLite model converted successfully")
+    convert_dataset()
+    print("Dataset converted successfully")
 
 def load_models():
-    global cnn_model, knn_model, dataset
+    global cnn_model, dataset, interpreters, input_index, output_index
+    global food_names, kalori, karbohidrat, protein, lemak
+    global name_to_idx, features_np, _infer
     
+    # Convert to TFLite once and reuse the cached file afterwards
+    needs_conversion = INFERENCE_BACKEND != 'xla' and (
+        not os.path.exists(TFLITE_MODEL_PATH)
+        or os.path.getmtime(TFLITE_MODEL_PATH) < os.path.getmtime('v1.h5')
+    )
+
+    # The FP32 Keras model is only kept in memory for the XLA backend
+    cnn_model = None
+    if INFERENCE_BACKEND == 'xla' or needs_conversion:
+        try:
+            # Load CNN model
+            model = tf.keras.models.load_model('v1.h5', compile=False)
+            print("CNN model loaded successfully")
+        except Exception as e:
+            print(f"Error loading CNN model: {str(e)}")
+            raise
+        if INFERENCE_BACKEND == 'xla':
+            # A new function per load, so a reload never keeps tracing
+            # against the previous model's variables
+            cnn_model = model
+            _infer = make_infer(cnn_model)
+
     try:
-        # Load CNN model
-        cnn_model = tf.keras.models.load_model('v1.h5', compile=False)
-        cnn_model.compile(
-            optimizer='adam',
-            loss='categorical_crossentropy',
-            metrics=['accuracy']
-        )
-        print("CNN model loaded successfully")
+        if needs_conversion:
+            convert_to_tflite(model)
+            print("TFLite model converted successfully")
+
+        # One set of fixed batch size interpreters per batch worker
+        interpreters = [create_interpreters() for _ in range(INFERENCE_WORKERS)]
+        if INFERENCE_BACKEND != 'xla':
+            first = interpreters[0][BATCH_SIZES[0]]
+            input_index = first.get_input_details()[0]['index']
+            output_index = first.get_output_details()[0]['index']
+            print(f"TFLite interpreters loaded successfully "
+                  f"({INFERENCE_WORKERS} x {TFLITE_THREADS} threads)")
+
+        # Trace preprocessing and inference (XLA compile) for every batch
+        # size before serving
+        dummy = tf.io.encode_jpeg(tf.zeros((224, 224, 3), dtype=tf.uint8))
+        preprocess_image(dummy)
+        for interpreters_by_size in interpreters:
+            for batch_size, interpreter in interpreters_by_size.items():
+                run_inference(
+                    np.zeros((batch_size, 224, 224, 3), dtype=np.float32),
+                    interpreter
+                )
+        print("Inference warmed up successfully")
     except Exception as e:
-        print(f"Error loading CNN model: {str(e)}")
+        print(f"Error preparing inference backend: {str(e)}")
         raise
 
+    # Workers that already run pick up the new interpreters by slot
+    for slot in range(len(batch_threads), len(interpreters)):
+        thread = threading.Thread(target=batch_worker, args=(slot,), daemon=True)
+        thread.start()
+        batch_threads.append(thread)
+    print(f"{len(batch_threads)} batch workers running")
+
     try:
-        # Load dataset
-        with open('dataset.json') as f:
-            dataset = json.load(f)
+        # Convert dataset once and reuse the cached file afterwards
+        if (not os.path.exists(DATASET_PATH)
+                or os.path.getmtime(DATASET_PATH) < os.path.getmtime(DATASET_JSON_PATH)):
+            convert_dataset()
+            print("Dataset converted successfully")
+
+        # Memory-map the dataset; the numeric columns and the feature
+        # matrix are zero-copy views, so their pages are shared across
+        # workers. Names are copied into a list for the name lookup
+        dataset = pa.ipc.open_file(pa.memory_map(DATASET_PATH)).read_all()
+        food_names = dataset.column("Nama Makanan/Minuman").to_pylist()
+        kalori = dataset.column("Kalori (kcal)").chunk(0).to_numpy()
+        karbohidrat = dataset.column("Karbohidrat (g)").chunk(0).to_numpy()
+        protein = dataset.column("Protein (g)").chunk(0).to_numpy()
+        lemak = dataset.column("Lemak (g)").chunk(0).to_numpy()
         print("Dataset loaded successfully")
+
+        # Precompute name lookup (first match wins)
+        name_to_idx = {}
+        for i, name in enumerate(food_names):
+            name_to_idx.setdefault(name.lower(), i)
         
-        # Create DataFrame from dataset
-        df = pd.DataFrame(dataset)
-        
-        # Create and train KNN model
-        knn_model = create_knn_model(df)
+        # Create KNN feature matrix
+        features_np = create_knn_model(dataset)
+
+        # Cached recommendations refer to the previous dataset
+        recommend_for_name.cache_clear()
         print("KNN model created successfully")
         
     except Exception as e:
         print(f"Error loading dataset or creating KNN model: {str(e)}")
         raise
 
-def predict_food(image_path):
-    """Predict food from image and get nutrition info"""
+def predict_food(image_bytes):
+    """Predict food from image bytes and get nutrition info"""
+    global pending_requests
+    with pending_lock:
+        pending_requests += 1
     try:
-        img = Image.open(image_path)
-        img = img.resize((224, 224))
-        img_array = np.array(img) / 255.0
-        img_array = np.expand_dims(img_array, axis=0)
-        
-        prediction = cnn_model.predict(img_array)
-        predicted_class = np.argmax(prediction, axis=1)[0]
-        confidence = float(np.max(prediction))
+        img_array = preprocess_image(tf.constant(image_bytes)).numpy()
+
+        # Hand the image to the batch worker and wait for its result
+        event = threading.Event()
+        result = {}
+        request_queue.put((img_array, event, result))
+        event.wait()
+        if 'error' in result:
+            raise result['error']
+
+        predicted_class = result['class']
+        confidence = result['confidence']
         
-        food_name = dataset[predicted_class]["Nama Makanan/Minuman"]
-        nutrition = {
-            "kalori": dataset[predicted_class]["Kalori (kcal)"],
-            "karbohidrat": dataset[predicted_class]["Karbohidrat (g)"],
-            "protein": dataset[predicted_class]["Protein (g)"],
-            "lemak": dataset[predicted_class]["Lemak (g)"]
-        }
+        food_name = food_names[predicted_class]
+        nutrition = get_nutrition(predicted_class)
         return food_name, nutrition, confidence
     except Exception as e:
         print(f"Error in predict_food: {str(e)}")
         raise
+    finally:
+        with pending_lock:
+            pending_requests -= 1
 
 def get_food_recommendations(food_features):
     """Get food recommendations using KNN model"""
     try:
-        # Get nearest neighbors
-        distances, indices = knn_model.kneighbors([food_features])
-        
-        recommendations = []
-        for idx in indices[0]:
-            food = dataset[idx]
-            recommendations.append({
-                "nama": food["Nama Makanan/Minuman"],
+        # Get nearest neighbors by brute-force Euclidean distance
+        diff = features_np - np.asarray(food_features, dtype=np.float32)
+        d2 = np.einsum('ij,ij->i', diff, diff)
+        # Stable sort so tied neighbors are ordered by dataset index
+        idx = np.argsort(d2, kind='stable')[:N_NEIGHBORS]
+        similarities = 1.0 / (1.0 + np.sqrt(d2[idx]))
+
+        # Gather neighbor columns with one fancy-index per column
+        return [
+            {
+                "nama": food_names[i],
                 "nutrition": {
-                    "kalori": food["Kalori (kcal)"],
-                    "karbohidrat": food["Karbohidrat (g)"],
-                    "protein": food["Protein (g)"],
-                    "lemak": food["Lemak (g)"]
+                    "kalori": as_number(kal),
+                    "karbohidrat": as_number(karb),
+                    "protein": as_number(prot),
+                    "lemak": as_number(lem)
                 },
-                "similarity_score": float(1 / (1 + distances[0][len(recommendations)]))
-            })
-        return recommendations
+                "similarity_score": similarity
+            }
+            for i, kal, karb, prot, lem, similarity in zip(
+                idx,
+                kalori[idx],
+                karbohidrat[idx],
+                protein[idx],
+                lemak[idx],
+                similarities
+            )
+        ]
     except Exception as e:
         print(f"Error in get_food_recommendations: {str(e)}")
         raise
 
+@lru_cache(maxsize=1024)
+def recommend_for_name(food_name):
+    """Get input food and recommendations for a known lowercased food name"""
+    idx = name_to_idx[food_name]
+    recommendations = get_food_recommendations(features_np[idx])
+    return food_names[idx], get_nutrition(idx), tuple(recommendations)
+
 @app.route('/predict', methods=['POST'])
 def predict():
     """Endpoint for food prediction from image"""
@@ -146,16 +500,8 @@ def predict():
         return jsonify({'error': 'No file selected'}), 400
         
     try:
-        # Create temp directory if it doesn't exist
-        os.makedirs('temp', exist_ok=True)
-        
-        file_path = os.path.join('temp', file.filename)
-        file.save(file_path)
-        
-        food_name, nutrition, confidence = predict_food(file_path)
-        
-        # Clean up temporary file
-        os.remove(file_path)
+        # Decode the upload from memory instead of a temporary file
+        food_name, nutrition, confidence = predict_food(file.read())
         
         # Get food features for recommendation
         food_features = [
@@ -184,6 +530,36 @@ def calculate():
         
         if not all(field in data for field in required_fields):
             return jsonify({'error': 'Missing required fields'}), 400
+
+        # Lists of values are computed together in one vectorized pass
+        if any(isinstance(data[field], list) for field in required_fields):
+            lengths = {
+                len(data[field]) if isinstance(data[field], list) else None
+                for field in required_fields
+            }
+            if None in lengths or len(lengths) != 1 or 0 in lengths:
+                return jsonify({
+                    'error': 'All fields must be non-empty lists of the same length'
+                }), 400
+
+            bmr, tdee = hitung_bmr_tdee_batch(
+                data['weight'],
+                data['height'],
+                data['age'],
+                data['gender'],
+                data['activity_level']
+            )
+            karbohidrat, protein, lemak = hitung_kebutuhan_makronutrien(tdee)
+
+            return jsonify({
+                'bmr': bmr,
+                'tdee': tdee,
+                'kebutuhan_harian': {
+                    'karbohidrat': karbohidrat,
+                    'protein': protein,
+                    'lemak': lemak
+                }
+            })
             
         bmr, tdee = hitung_bmr_tdee(
             data['weight'],
@@ -196,12 +572,12 @@ def calculate():
         karbohidrat, protein, lemak = hitung_kebutuhan_makronutrien(tdee)
         
         return jsonify({
-            'bmr': float(bmr),
-            'tdee': float(tdee),
+            'bmr': bmr,
+            'tdee': tdee,
             'kebutuhan_harian': {
-                'karbohidrat': float(karbohidrat),
-                'protein': float(protein),
-                'lemak': float(lemak)
+                'karbohidrat': karbohidrat,
+                'protein': protein,
+                'lemak': lemak
             }
         })
         
@@ -241,44 +617,34 @@ def recommend_by_name():
         if 'food_name' not in data:
             return jsonify({'error': 'Missing food_name field'}), 400
             
-        # Find the food in dataset
+        # Find the food in dataset; only known names reach the cache so
+        # unknown input cannot evict popular entries
         food_name = data['food_name'].lower()
-        food_data = None
-        
-        for food in dataset:
-            if food["Nama Makanan/Minuman"].lower() == food_name:
-                food_data = food
-                break
-                
-        if food_data is None:
+        if food_name not in name_to_idx:
             return jsonify({'error': 'Food not found in database'}), 404
-            
-        # Get food features
-        food_features = [
-            food_data["Karbohidrat (g)"],
-            food_data["Protein (g)"],
-            food_data["Lemak (g)"]
-        ]
-        
-        recommendations = get_food_recommendations(food_features)
+
+        nama, nutrition, recommendations = recommend_for_name(food_name)
         
         return jsonify({
             'input_food': {
-                'nama': food_data["Nama Makanan/Minuman"],
-                'nutrition': {
-                    'kalori': food_data["Kalori (kcal)"],
-                    'karbohidrat': food_data["Karbohidrat (g)"],
-                    'protein': food_data["Protein (g)"],
-                    'lemak': food_data["Lemak (g)"]
-                }
+                'nama': nama,
+                'nutrition': nutrition
             },
-            'recommendations': recommendations
+            'recommendations': list(recommendations)
         })
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-if __name__ == '__main__':
-    # Load models before running the app
+# Load models at import time so each WSGI worker process loads them once
+if __name__ != '__main__' and dataset is None:
     load_models()
-    app.run(debug=True, host='0.0.0.0', port=8080)
+
+if __name__ == '__main__':
+    if '--prepare' in sys.argv:
+        # Used at image build time so workers don't convert on startup
+        prepare_caches()
+    else:
+        load_models()
+        # The reloader would load models and start workers a second time
+        app.run(debug=True, host='0.0.0.0', port=8080, use_reloader=False)